@@ -3,15 +3,30 @@
 
 from __future__ import annotations
 
+import gc
+import itertools
 import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Iterable, Iterator, Tuple
+
+import matplotlib
+
+matplotlib.use("Agg")  # files only: skip GUI backend start-up (must precede pyplot)
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import seaborn as sns
 
+try:  # optional: multithreaded Arrow CSV reader for the transactions stream
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
 
 # =========================== Path helpers ===========================
 
@@ -20,7 +35,20 @@ def _script_dir() -> Path:
     return Path(__file__).resolve().parent
 
 
-def _find_data_file(*names: str) -> Path:
+def _search_dirs() -> Tuple[Path, ...]:
+    """DATA_DIR (if set), the script dir and the cwd, each followed by its data/ subfolder."""
+    bases = [Path(os.environ["DATA_DIR"])] if os.getenv("DATA_DIR") else []
+    bases += [_script_dir(), Path.cwd()]
+    dirs: list[Path] = []
+    for base in bases:
+        for d in (base, base / "data"):
+            if d not in dirs:
+                dirs.append(d)
+    return tuple(dirs)
+
+
+@lru_cache(maxsize=None)
+def _find_data_file(names: Tuple[str, ...]) -> Path:
     """
     Return the first existing path matching any of the filenames in *names*.
 
@@ -28,85 +56,196 @@ def _find_data_file(*names: str) -> Path:
       1) DATA_DIR/<name>, DATA_DIR/data/<name>               (if env var is set)
       2) <script_dir>/<name>, <script_dir>/data/<name>
       3) <cwd>/<name>, <cwd>/data/<name>
-      4) first hit from <script_dir>.rglob(<name>)
+      4) <script_dir>/<subdir>/<name> (one level down)
+      5) first hit from <script_dir>.rglob(<name>)           (only if DATA_DEEP_SEARCH=1)
+    Results are cached per *names*; DATA_DIR and the cwd are read on the first
+    lookup of each, not at import.
     """
-    script_dir = _script_dir()
-    env_dir = os.getenv("DATA_DIR")
-    env_dir = Path(env_dir) if env_dir else None
-
-    candidates: list[Path] = []
+    search_dirs = _search_dirs()
     for nm in names:
-        if env_dir:
-            candidates += [env_dir / nm, env_dir / "data" / nm]
-        candidates += [
-            script_dir / nm,
-            script_dir / "data" / nm,
-            Path.cwd() / nm,
-            Path.cwd() / "data" / nm,
-        ]
-
-    for p in candidates:
-        if p.is_file():
-            return p
-
-    # very last resort: recursive search under script_dir
-    for nm in names:
-        hits = list(script_dir.rglob(nm))
-        if hits:
-            return hits[0]
+        for d in search_dirs:
+            p = d / nm
+            if p.is_file():
+                return p
 
-    raise FileNotFoundError(f"Could not find any of: {', '.join(names)}")
+    script_dir = _script_dir()
+    subdirs = [d for d in script_dir.iterdir() if d.is_dir()]
+    for nm in names:
+        for d in subdirs:
+            p = d / nm
+            if p.is_file():
+                return p
+
+    # very last resort (opt-in, can walk a large tree): recursive search under script_dir
+    if os.getenv("DATA_DEEP_SEARCH", "0") == "1":
+        for nm in names:
+            hits = list(script_dir.rglob(nm))
+            if hits:
+                return hits[0]
+
+    raise FileNotFoundError(
+        f"Could not find any of: {', '.join(names)} "
+        f"(set DATA_DIR to its folder, or DATA_DEEP_SEARCH=1 to search every subfolder of {script_dir})"
+    )
 
 
 # =========================== Readers / Cleaning ===========================
 
 def _clean_amount_series(s: pd.Series) -> pd.Series:
-    return (
-        s.astype(str)
-         .str.replace("$", "", regex=False)
-         .str.replace(",", "", regex=False)
-         .astype(float)
-    )
-
-
-def read_transactions(path: Path) -> pd.DataFrame:
+    # literal (non-regex) replaces on the string column; no astype(str) round trip
+    return s.str.replace("$", "", regex=False).str.replace(",", "", regex=False).astype(np.float64)
+
+
+# rows per transactions chunk; only one chunk is held in memory at a time
+TRANSACTIONS_CHUNKSIZE = 500_000
+
+# compact dtypes for the columns we know about (absent columns are ignored,
+# everything else is inferred). Categoricals go to SQLite as TEXT unchanged.
+USERS_DTYPES = {"id": "int32", "current_age": "int16", "gender": "category"}
+CARDS_DTYPES = {"id": "int32", "client_id": "int32", "card_brand": "category", "card_type": "category"}
+TRANSACTIONS_DTYPES = {
+    "client_id": "int32",
+    "card_id": "int32",
+    "mcc": "int32",
+    "use_chip": "category",
+    "amount": "str",  # cleaned to float by _clean_amount_series
+}
+
+# columns loaded from each CSV (read_csv skips the rest without tokenising them):
+# everything analysis.py and analysis.sql read, plus the id/join keys.
+# Extend these when a new query needs another column.
+USERS_COLUMNS = frozenset(
+    {"id", "current_age", "gender", "credit_score", "num_credit_cards", "total_debt", "per_capita_income"}
+)
+CARDS_COLUMNS = frozenset({"id", "client_id", "card_brand", "card_type", "credit_limit", "card_on_dark_web"})
+TRANSACTIONS_COLUMNS = frozenset({"id", "date", "client_id", "card_id", "amount", "use_chip", "mcc"})
+
+# exact timestamp layout of the 'date' column: no per-chunk format guessing or
+# dateutil fallback. The column is kept (analysis.sql groups by month on it).
+TRANSACTIONS_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _normalise_transactions(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Read transactions from a plain CSV file.
-    Normalises:
+    Normalise a transactions frame in place:
       - 'date' -> datetime
       - 'amount' -> float (currency symbols/commas stripped)
     """
-    df = pd.read_csv(path)
     if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"])
+        df["date"] = pd.to_datetime(df["date"], format=TRANSACTIONS_DATE_FORMAT, cache=True)
     if "amount" in df.columns:
         df["amount"] = _clean_amount_series(df["amount"])
     return df
 
 
-def load_data(users_path: Path, cards_path: Path, transactions_path: Path) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    users = pd.read_csv(users_path)
-    cards = pd.read_csv(cards_path)
-    transactions = read_transactions(transactions_path)
-    return users, cards, transactions
+def _arrow_transactions_chunk(batches: list, schema: pa.Schema) -> pd.DataFrame:
+    df = pa.Table.from_batches(batches, schema=schema).to_pandas()
+    # 'amount' is already a string column; astype("str") would turn its nulls
+    # into the text 'None' on pandas 2.x, so it goes to _clean_amount_series as is
+    df = df.astype({c: t for c, t in TRANSACTIONS_DTYPES.items() if c in df.columns and c != "amount"})
+    return _normalise_transactions(df)
+
+
+def _stream_transactions_arrow(path: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """stream_transactions() on pyarrow's CSV reader, which parses each block on all cores."""
+    header = pd.read_csv(path, nrows=0).columns
+    convert = pa_csv.ConvertOptions(
+        include_columns=[c for c in header if c in TRANSACTIONS_COLUMNS],
+        column_types={"amount": pa.string()},
+        strings_can_be_null=True,  # empty field -> NaN, as with the C engine
+        timestamp_parsers=[TRANSACTIONS_DATE_FORMAT],
+    )
+    # the reader yields ~1 MB record batches; regroup them into chunks of ~chunksize rows
+    reader = pa_csv.open_csv(path, convert_options=convert)
+    batches: list = []
+    rows = 0
+    yielded = False
+    for batch in reader:
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= chunksize:
+            yield _arrow_transactions_chunk(batches, reader.schema)
+            yielded = True
+            batches, rows = [], 0
+    # a header-only file gives no batches: still yield one empty chunk, like the C reader
+    if batches or not yielded:
+        yield _arrow_transactions_chunk(batches, reader.schema)
+
+
+def stream_transactions(path: Path, chunksize: int = TRANSACTIONS_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """
+    Read transactions from a plain CSV file in chunks of (about) *chunksize* rows.
+    Each chunk is passed through _normalise_transactions().
+    Uses pyarrow's multithreaded CSV reader when pyarrow is installed.
+    """
+    if pa_csv is not None:
+        yield from _stream_transactions_arrow(path, chunksize)
+        return
+    with pd.read_csv(
+        path,
+        chunksize=chunksize,
+        usecols=TRANSACTIONS_COLUMNS.__contains__,
+        dtype=TRANSACTIONS_DTYPES,
+        engine="c",
+    ) as reader:
+        for chunk in reader:
+            yield _normalise_transactions(chunk)
+
+
+def _prefetch(chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Yield from *chunks* while the next chunk is already being parsed on a worker thread."""
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(next, chunks, None)
+        while True:
+            chunk = pending.result()
+            if chunk is None:
+                return
+            pending = pool.submit(next, chunks, None)
+            yield chunk
+
+
+def load_data(
+    users_path: Path, cards_path: Path, transactions_path: Path
+) -> Tuple[pd.DataFrame, pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    Users and cards are read whole; transactions come back as a chunk iterator.
+    The C parser releases the GIL, so parsing happens on worker threads: users
+    and cards side by side, and each transactions chunk is parsed while the
+    caller is still busy with the previous one.
+    """
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        users = pool.submit(
+            pd.read_csv, users_path, usecols=USERS_COLUMNS.__contains__, dtype=USERS_DTYPES, engine="c"
+        )
+        cards = pool.submit(
+            pd.read_csv, cards_path, usecols=CARDS_COLUMNS.__contains__, dtype=CARDS_DTYPES, engine="c"
+        )
+        transactions = _prefetch(stream_transactions(transactions_path))
+        return users.result(), cards.result(), transactions
 
 
 # =========================== Preview logging ===========================
 
-def _preview_df(label: str, df: pd.DataFrame, path: Path) -> str:
-    """Return a human-readable preview string and also print it."""
+def _preview_df(label: str, df: pd.DataFrame, path: Path, detailed: bool = True) -> str:
+    """
+    Return a human-readable preview string and also print it.
+    Columns and key presence come from the file's header; shape, dtypes and
+    head(5) describe *df*, i.e. only the loaded (*_COLUMNS) columns.
+    dtypes and head(5) are only rendered when *detailed* (PREVIEW_ONLY runs).
+    """
+    header = pd.read_csv(path, nrows=0).columns
     lines: list[str] = []
     lines.append(f"[{label}]  file: {path}")
-    lines.append(f"[{label}]  shape: {df.shape[0]} rows × {df.shape[1]} cols")
-    lines.append(f"[{label}]  columns: {', '.join(map(str, df.columns))}")
-    # dtypes + head
-    with pd.option_context("display.max_rows", 200, "display.max_columns", 200):
-        lines.append(f"[{label}]  dtypes:\n{df.dtypes.to_string()}")
-        head_str = df.head(5).to_string(index=False)
-        lines.append(f"[{label}]  head(5):\n{head_str}")
+    lines.append(f"[{label}]  loaded shape: {df.shape[0]} rows × {df.shape[1]} cols")
+    lines.append(f"[{label}]  file columns: {', '.join(map(str, header))}")
+    if detailed:
+        with pd.option_context("display.max_rows", 200):
+            lines.append(f"[{label}]  dtypes:\n{df.dtypes.to_string()}")
+        # CSV text: no column-width alignment pass like to_string()
+        lines.append(f"[{label}]  head(5):\n{df.head(5).to_csv(None, index=False).rstrip()}")
     # common key presence
     keys = ["id", "client_id", "card_id", "user_id", "customer_id"]
-    present = ", ".join(f"{k}={'Y' if k in df.columns else 'N'}" for k in keys)
+    present = ", ".join(f"{k}={'Y' if k in header else 'N'}" for k in keys)
     lines.append(f"[{label}]  key columns present: {present}")
     text = "\n".join(lines)
     print(text + "\n" + "-" * 80)
@@ -115,103 +254,169 @@ def _preview_df(label: str, df: pd.DataFrame, path: Path) -> str:
 
 # =========================== Storage & Queries ===========================
 
-def normalise_and_store_sqlite(users: pd.DataFrame, cards: pd.DataFrame, transactions: pd.DataFrame, db_path: Path) -> None:
+# connection settings for the bulk load: WAL + synchronous=NORMAL means the
+# commit doesn't fsync, and the rest keep the page cache/temp b-trees in memory
+# and skip per-statement lock handshakes
+_SQLITE_LOAD_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-262144",  # KiB, i.e. 256 MiB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA locking_mode=EXCLUSIVE",
+)
+
+# built once the data is in (cheaper than maintaining them during the inserts).
+# Only the small tables are indexed: an index on transactions costs a full
+# scan + sort on every run, more than the single query scan it would save.
+# ANALYZE is limited to the indexed tables so transactions isn't scanned again.
+_SQL_INDEXES = """
+CREATE INDEX idx_cards_id_brand ON cards(id, card_brand);
+CREATE INDEX idx_cards_brand ON cards(card_brand);
+CREATE INDEX idx_cards_type ON cards(card_type);
+CREATE INDEX idx_users_id ON users(id);
+CREATE INDEX idx_users_gender ON users(gender);
+ANALYZE cards;
+ANALYZE users;
+"""
+
+def _recreate_table(conn: sqlite3.Connection, name: str, df: pd.DataFrame) -> None:
+    """Drop *name* and create it empty with the schema pandas infers for *df*."""
+    conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+    conn.execute(pd.io.sql.get_schema(df, name, con=conn))
+
+
+def _insert_rows(conn: sqlite3.Connection, name: str, df: pd.DataFrame) -> None:
+    """INSERT every row of *df* into *name* (no commit: to_sql would commit per call)."""
+    cols = ", ".join(f'"{c}"' for c in df.columns)
+    params = ", ".join("?" * len(df.columns))
+    # datetimes go in as the same 'YYYY-MM-DD HH:MM:SS' text to_sql writes (NaT -> NULL),
+    # formatted per column rather than adapting a Timestamp per row
+    values = [
+        s.dt.strftime(TRANSACTIONS_DATE_FORMAT) if s.dtype.kind == "M" else s
+        for _, s in df.items()
+    ]
+    conn.executemany(f'INSERT INTO "{name}" ({cols}) VALUES ({params})', zip(*values))
+
+
+def normalise_and_store_sqlite(
+    users: pd.DataFrame,
+    cards: pd.DataFrame,
+    transactions: Iterable[pd.DataFrame],
+    db_path: Path,
+) -> None:
+    """
+    Write users/cards, then append transactions chunk by chunk as they stream in.
+    The whole load is one transaction: if a chunk fails to parse, the tables
+    are rolled back and the database keeps its previous contents.
+    Indexes are built (and ANALYZE run) after the load, before any query.
+    """
     conn = sqlite3.connect(str(db_path))
     try:
-        users.to_sql("users", conn, if_exists="replace", index=False)
-        cards.to_sql("cards", conn, if_exists="replace", index=False)
-        transactions.to_sql("transactions", conn, if_exists="replace", index=False)
+        for pragma in _SQLITE_LOAD_PRAGMAS:
+            conn.execute(pragma)
+        with conn:
+            # explicit BEGIN: sqlite3 only opens a transaction implicitly before DML,
+            # so the DROP/CREATE statements would otherwise be committed on their own
+            conn.execute("BEGIN")
+            for name, df in (("users", users), ("cards", cards)):
+                _recreate_table(conn, name, df)
+                _insert_rows(conn, name, df)
+            for i, chunk in enumerate(transactions):
+                if i == 0:
+                    _recreate_table(conn, "transactions", chunk)
+                _insert_rows(conn, "transactions", chunk)
+        conn.executescript(_SQL_INDEXES)
     finally:
         conn.close()
 
 
+# top_mcc and transaction_methods share one scan of transactions:
+# count per (use_chip, mcc) into a small temp table, then roll it up twice
+_SQL_SETUP = """
+CREATE TEMP TABLE txn_method_mcc AS
+SELECT use_chip, mcc, COUNT(*) AS txn_count
+FROM transactions
+GROUP BY use_chip, mcc;
+"""
+
+# result name -> query; every result is small, so rows are fetched directly
+_SQL: Dict[str, str] = {
+    "gender_distribution": """
+        SELECT gender, COUNT(*) AS num_users
+        FROM users
+        GROUP BY gender;
+    """,
+    "age_distribution": """
+        SELECT
+          CASE
+            WHEN current_age < 30 THEN '<30'
+            WHEN current_age BETWEEN 30 AND 39 THEN '30-39'
+            WHEN current_age BETWEEN 40 AND 49 THEN '40-49'
+            WHEN current_age BETWEEN 50 AND 59 THEN '50-59'
+            WHEN current_age BETWEEN 60 AND 69 THEN '60-69'
+            ELSE '70+'
+          END AS age_bucket,
+          COUNT(*) AS num_users
+        FROM users
+        GROUP BY age_bucket
+        ORDER BY age_bucket;
+    """,
+    "card_brand_distribution": """
+        SELECT card_brand, COUNT(*) AS num_cards
+        FROM cards
+        GROUP BY card_brand
+        ORDER BY num_cards DESC;
+    """,
+    "card_type_distribution": """
+        SELECT card_type, COUNT(*) AS num_cards
+        FROM cards
+        GROUP BY card_type
+        ORDER BY num_cards DESC;
+    """,
+    "top_mcc": """
+        SELECT mcc, SUM(txn_count) AS txn_count
+        FROM txn_method_mcc
+        GROUP BY mcc
+        ORDER BY txn_count DESC
+        LIMIT 5;
+    """,
+    "transaction_methods": """
+        SELECT use_chip, SUM(txn_count) AS txn_count
+        FROM txn_method_mcc
+        GROUP BY use_chip;
+    """,
+    # amount is stored as REAL; no string cleaning needed in SQL
+    "avg_txn_amount_by_brand": """
+        SELECT
+          c.card_brand,
+          AVG(t.amount) AS avg_amount
+        FROM transactions t
+        JOIN cards c ON t.card_id = c.id
+        GROUP BY c.card_brand
+        ORDER BY avg_amount DESC;
+    """,
+}
+
+
 def run_queries(db_path: Path) -> Dict[str, pd.DataFrame]:
+    """
+    Run every query in _SQL and return name -> DataFrame.
+    Set EXPLAIN_QUERIES=1 to print each query plan (e.g. to check index use).
+    """
+    explain = os.getenv("EXPLAIN_QUERIES", "0") == "1"
     conn = sqlite3.connect(str(db_path))
     try:
+        conn.executescript(_SQL_SETUP)
         out: Dict[str, pd.DataFrame] = {}
-
-        out["gender_distribution"] = pd.read_sql_query(
-            """
-            SELECT gender, COUNT(*) AS num_users
-            FROM users
-            GROUP BY gender;
-            """,
-            conn,
-        )
-
-        out["age_distribution"] = pd.read_sql_query(
-            """
-            SELECT
-              CASE
-                WHEN current_age < 30 THEN '<30'
-                WHEN current_age BETWEEN 30 AND 39 THEN '30-39'
-                WHEN current_age BETWEEN 40 AND 49 THEN '40-49'
-                WHEN current_age BETWEEN 50 AND 59 THEN '50-59'
-                WHEN current_age BETWEEN 60 AND 69 THEN '60-69'
-                ELSE '70+'
-              END AS age_bucket,
-              COUNT(*) AS num_users
-            FROM users
-            GROUP BY age_bucket
-            ORDER BY age_bucket;
-            """,
-            conn,
-        )
-
-        out["card_brand_distribution"] = pd.read_sql_query(
-            """
-            SELECT card_brand, COUNT(*) AS num_cards
-            FROM cards
-            GROUP BY card_brand
-            ORDER BY num_cards DESC;
-            """,
-            conn,
-        )
-
-        out["card_type_distribution"] = pd.read_sql_query(
-            """
-            SELECT card_type, COUNT(*) AS num_cards
-            FROM cards
-            GROUP BY card_type
-            ORDER BY num_cards DESC;
-            """,
-            conn,
-        )
-
-        out["top_mcc"] = pd.read_sql_query(
-            """
-            SELECT mcc, COUNT(*) AS txn_count
-            FROM transactions
-            GROUP BY mcc
-            ORDER BY txn_count DESC
-            LIMIT 5;
-            """,
-            conn,
-        )
-
-        out["transaction_methods"] = pd.read_sql_query(
-            """
-            SELECT use_chip, COUNT(*) AS txn_count
-            FROM transactions
-            GROUP BY use_chip;
-            """,
-            conn,
-        )
-
-        # amount is stored as REAL; no string cleaning needed in SQL
-        out["avg_txn_amount_by_brand"] = pd.read_sql_query(
-            """
-            SELECT
-              c.card_brand,
-              AVG(t.amount) AS avg_amount
-            FROM transactions t
-            JOIN cards c ON t.card_id = c.id
-            GROUP BY c.card_brand
-            ORDER BY avg_amount DESC;
-            """,
-            conn,
-        )
-
+        cur = conn.cursor()
+        for name, sql in _SQL.items():
+            if explain:
+                plan = cur.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+                print(f"[{name}] query plan:\n" + "\n".join(f"  {row[-1]}" for row in plan))
+            cur.execute(sql)
+            # tiny results: skip read_sql_query's dtype inference/block building
+            rows = cur.fetchall()
+            out[name] = pd.DataFrame(rows, columns=[d[0] for d in cur.description])
         return out
     finally:
         conn.close()
@@ -225,115 +430,109 @@ def save_query_results(results: Dict[str, pd.DataFrame], out_dir: Path) -> None:
 
 # =========================== Charts ===========================
 
-def create_charts(
-    users: pd.DataFrame,
-    cards: pd.DataFrame,
-    transactions: pd.DataFrame,
-    out_dir: Path,
-) -> None:
-    """Generate charts and save under out_dir."""
+# display order for the age chart
+_AGE_LABELS = ["<30", "30-39", "40-49", "50-59", "60-69", "70+"]
+
+
+def _bar(ax: plt.Axes, df: pd.DataFrame, x: str, y: str) -> None:
+    """Plain categorical bar chart in the pastel palette (no seaborn estimator pass)."""
+    ax.bar(df[x].astype(str), df[y], color=sns.color_palette("pastel", len(df)))
+    ax.xaxis.grid(False)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+
+
+def create_charts(results: Dict[str, pd.DataFrame], out_dir: Path) -> None:
+    """Generate charts from the run_queries() results and save under out_dir."""
     out_dir.mkdir(parents=True, exist_ok=True)
     sns.set_style("whitegrid")
 
-    # Gender
-    if "gender" in users.columns:
-        gender_counts = users["gender"].value_counts().rename_axis("gender").reset_index(name="count")
-        plt.figure(figsize=(5, 3))
-        sns.barplot(x="gender", y="count", data=gender_counts, palette="pastel")
-        plt.title("Gender distribution of users")
-        plt.ylabel("Number of users")
-        plt.savefig(out_dir / "gender_distribution.png", bbox_inches="tight")
-        plt.close()
-
-    # Card type
-    if "card_type" in cards.columns:
-        type_counts = cards["card_type"].value_counts().rename_axis("card_type").reset_index(name="count")
-        plt.figure(figsize=(5, 3))
-        plt.pie(
-            type_counts["count"],
-            labels=type_counts["card_type"],
-            autopct="%.1f%%",
-            colors=sns.color_palette("pastel"),
-        )
-        plt.title("Card type distribution")
-        plt.savefig(out_dir / "card_type_distribution.png", bbox_inches="tight")
-        plt.close()
-
-    # Age buckets
-    if "current_age" in users.columns:
-        def bucket(a: int) -> str:
-            if a < 30:
-                return "<30"
-            if a < 40:
-                return "30-39"
-            if a < 50:
-                return "40-49"
-            if a < 60:
-                return "50-59"
-            if a < 70:
-                return "60-69"
-            return "70+"
-
-        age_buckets = (
-            users["current_age"].apply(bucket).value_counts().rename_axis("age_bucket").reset_index(name="count")
-        )
-        age_buckets = age_buckets.sort_values("age_bucket")
-        plt.figure(figsize=(5, 3))
-        sns.barplot(x="age_bucket", y="count", data=age_buckets, palette="pastel")
-        plt.title("Age distribution of users")
-        plt.ylabel("Number of users")
-        plt.xlabel("Age bracket")
-        plt.savefig(out_dir / "age_distribution.png", bbox_inches="tight")
-        plt.close()
-
-    # Transaction methods
-    if "use_chip" in transactions.columns:
-        method_counts = transactions["use_chip"].value_counts().rename_axis("method").reset_index(name="count")
-        plt.figure(figsize=(5, 3))
-        sns.barplot(x="method", y="count", data=method_counts, palette="pastel")
-        plt.title("Transaction method distribution")
-        plt.ylabel("Number of transactions")
-        plt.xticks(rotation=45, ha="right")
-        plt.savefig(out_dir / "transaction_method_distribution.png", bbox_inches="tight")
-        plt.close()
-
-    # Top MCC
-    if "mcc" in transactions.columns:
-        top_mcc = transactions["mcc"].astype(str).value_counts().head(5).rename_axis("mcc").reset_index(name="count")
-        plt.figure(figsize=(5, 3))
-        sns.barplot(x="mcc", y="count", data=top_mcc, palette="pastel")
-        plt.title("Top merchant categories by frequency")
-        plt.ylabel("Number of transactions")
-        plt.xlabel("MCC code")
-        plt.savefig(out_dir / "top_mcc_frequency.png", bbox_inches="tight")
-        plt.close()
-
-    # Avg transaction amount by brand (map card_id -> card_brand to avoid huge join)
-    if {"card_brand", "id"} <= set(cards.columns) and {"card_id", "amount"} <= set(transactions.columns):
-        brand_map = cards.set_index("id")["card_brand"]
-        tx_with_brand = transactions.assign(card_brand=transactions["card_id"].map(brand_map))
-        brand_avg = (
-            tx_with_brand.groupby("card_brand", dropna=True)["amount"]
-            .mean()
-            .reset_index()
-            .sort_values("amount", ascending=False)
-        )
-        plt.figure(figsize=(5, 3))
-        sns.barplot(x="card_brand", y="amount", data=brand_avg, palette="pastel")
-        plt.title("Average transaction amount by card brand")
-        plt.ylabel("Average amount")
-        plt.xlabel("Card brand")
-        plt.savefig(out_dir / "avg_amount_by_brand.png", bbox_inches="tight")
-        plt.close()
+    # one figure for every chart, cleared in between (fresh axes: the pie changes aspect)
+    fig = plt.figure(figsize=(5, 3))
+
+    def new_axes() -> plt.Axes:
+        fig.clear()
+        return fig.add_subplot()
+
+    def save(name: str) -> None:
+        fig.savefig(out_dir / name, bbox_inches="tight", dpi=100)
+
+    try:
+        # Gender
+        if "gender_distribution" in results:
+            ax = new_axes()
+            # bars by count, descending (the SQL result is unordered; CSV left as is)
+            genders = results["gender_distribution"].sort_values("num_users", ascending=False)
+            _bar(ax, genders, "gender", "num_users")
+            ax.set_title("Gender distribution of users")
+            ax.set_ylabel("Number of users")
+            save("gender_distribution.png")
+
+        # Card type
+        if "card_type_distribution" in results:
+            ax = new_axes()
+            type_counts = results["card_type_distribution"]
+            ax.pie(
+                type_counts["num_cards"],
+                labels=type_counts["card_type"],
+                autopct="%.1f%%",
+                colors=sns.color_palette("pastel"),
+            )
+            ax.set_title("Card type distribution")
+            save("card_type_distribution.png")
+
+        # Age buckets (the SQL result is sorted as text; plot in bracket order)
+        if "age_distribution" in results:
+            ax = new_axes()
+            age_buckets = results["age_distribution"]
+            rank = {b: i for i, b in enumerate(_AGE_LABELS)}
+            age_buckets = age_buckets.sort_values("age_bucket", key=lambda s: s.map(rank))
+            _bar(ax, age_buckets, "age_bucket", "num_users")
+            ax.set_title("Age distribution of users")
+            ax.set_ylabel("Number of users")
+            ax.set_xlabel("Age bracket")
+            save("age_distribution.png")
+
+        # Transaction methods
+        if "transaction_methods" in results:
+            ax = new_axes()
+            # bars by count, descending (the SQL result is unordered; CSV left as is)
+            methods = results["transaction_methods"].sort_values("txn_count", ascending=False)
+            _bar(ax, methods, "use_chip", "txn_count")
+            ax.set_title("Transaction method distribution")
+            ax.set_ylabel("Number of transactions")
+            ax.set_xlabel("method")
+            plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+            save("transaction_method_distribution.png")
+
+        # Top MCC
+        if "top_mcc" in results:
+            ax = new_axes()
+            _bar(ax, results["top_mcc"], "mcc", "txn_count")
+            ax.set_title("Top merchant categories by frequency")
+            ax.set_ylabel("Number of transactions")
+            ax.set_xlabel("MCC code")
+            save("top_mcc_frequency.png")
+
+        # Avg transaction amount by brand
+        if "avg_txn_amount_by_brand" in results:
+            ax = new_axes()
+            _bar(ax, results["avg_txn_amount_by_brand"], "card_brand", "avg_amount")
+            ax.set_title("Average transaction amount by card brand")
+            ax.set_ylabel("Average amount")
+            ax.set_xlabel("Card brand")
+            save("avg_amount_by_brand.png")
+    finally:
+        plt.close(fig)
 
 
 # =========================== Main ===========================
 
 def main() -> None:
     # Data files (transactions are CSV only)
-    users_path = _find_data_file("users_data.csv")
-    cards_path = _find_data_file("cards_data.csv")
-    transactions_path = _find_data_file("transactions_data.csv")
+    users_path = _find_data_file(("users_data.csv",))
+    cards_path = _find_data_file(("cards_data.csv",))
+    transactions_path = _find_data_file(("transactions_data.csv",))
 
     print("Using data files:")
     print(f"  {users_path}")
@@ -343,10 +542,18 @@ def main() -> None:
     users, cards, transactions = load_data(users_path, cards_path, transactions_path)
 
     # ---------- PREVIEW ----------
+    preview_only = os.getenv("PREVIEW_ONLY", "0") == "1"
     preview_txt = []
-    preview_txt.append(_preview_df("USERS", users, users_path))
-    preview_txt.append(_preview_df("CARDS", cards, cards_path))
-    preview_txt.append(_preview_df("TRANSACTIONS", transactions, transactions_path))
+    preview_txt.append(_preview_df("USERS", users, users_path, detailed=preview_only))
+    preview_txt.append(_preview_df("CARDS", cards, cards_path, detailed=preview_only))
+    # transactions are streamed: preview the first chunk, then put it back in front
+    first_chunk = next(transactions, None)
+    if first_chunk is not None:
+        transactions = itertools.chain([first_chunk], transactions)
+        preview_txt.append(
+            _preview_df("TRANSACTIONS (first chunk)", first_chunk, transactions_path, detailed=preview_only)
+        )
+    del first_chunk  # the chain is now the only holder, so it's freed once written
 
     log_path = _script_dir() / "data_preview.txt"
     with open(log_path, "w", encoding="utf-8") as f:
@@ -354,7 +561,7 @@ def main() -> None:
     print(f"Preview written to: {log_path}\n")
 
     # Optional: stop after preview (no DB/plots)
-    if os.getenv("PREVIEW_ONLY", "0") == "1":
+    if preview_only:
         print("PREVIEW_ONLY=1 => stopping after preview.")
         return
 
@@ -365,11 +572,14 @@ def main() -> None:
     charts_dir = proj / "charts"
 
     normalise_and_store_sqlite(users, cards, transactions, db_path)
+    # everything downstream reads SQLite / the small results: release the raw frames
+    del users, cards, transactions
+    gc.collect()
     results = run_queries(db_path)
     save_query_results(results, results_dir)
 
-    # ---------- Charts ----------
-    create_charts(users, cards, transactions, charts_dir)
+    # ---------- Charts (from the query results; no second pass over the data) ----------
+    create_charts(results, charts_dir)
 
     print("Done.")
     print(f"SQLite : {db_path}")